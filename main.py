@@ -1,24 +1,73 @@
 import os
-from fastapi import FastAPI, HTTPException
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
-from passlib.context import CryptContext
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Optional, List, Tuple
+import orjson
+import bcrypt
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
-from database import db, create_document, get_documents
+import database
+from database import create_document, create_documents
 
-app = FastAPI(title="SaaS Landing API")
+logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connect inside the running loop (per worker), warm the pool, then prepare collections
+    db = database.connect()
+    app.state.db = db
+    if db is not None:
+        try:
+            await db.command("ping")
+        except Exception as e:
+            logger.warning("Database ping failed: %s", e)
+        await ensure_indexes(db)
+        await seed_blog(db)
+    yield
+    database.close()
+
+app = FastAPI(title="SaaS Landing API", default_response_class=ORJSONResponse, lifespan=lifespan)
+
+# Explicit origins (comma-separated in FRONTEND_ORIGIN) and a long max_age let
+# browsers cache preflight responses instead of sending OPTIONS on every call
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=[o.strip() for o in os.getenv("FRONTEND_ORIGIN", "http://localhost:3000").split(",") if o.strip()],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization"],
+    max_age=86400,
 )
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Compress larger bodies such as /blog; tiny responses stay uncompressed
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Hashing cost is a deployment parameter: tune it so a single hash stays
+# within the login latency budget on the target hardware. Hashes stored with
+# a different cost are upgraded on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 10))
+
+# Blog posts change rarely; serve the encoded list from memory for this many seconds
+BLOG_CACHE_TTL = float(os.getenv("BLOG_CACHE_TTL", 60))
+_blog_cache: Optional[Tuple[float, bytes]] = None
+
+# /test diagnostics may be polled often; reuse the collection listing briefly
+COLLECTIONS_CACHE_TTL = 10.0
+_collections_cache: Optional[Tuple[float, List[str]]] = None
+
+# Password hashing is CPU-bound; run it off the event loop so other requests keep flowing,
+# and cap concurrent hashes at the core count so extra requests wait instead of thrashing
+_hash_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+_hash_semaphore = asyncio.Semaphore(os.cpu_count() or 1)
 
 # --------- Models ---------
 class RegisterRequest(BaseModel):
@@ -26,10 +75,20 @@ class RegisterRequest(BaseModel):
     email: EmailStr
     password: str = Field(min_length=6)
 
+    @field_validator("email")
+    @classmethod
+    def _lowercase_email(cls, v: str) -> str:
+        return v.lower()
+
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
 
+    @field_validator("email")
+    @classmethod
+    def _lowercase_email(cls, v: str) -> str:
+        return v.lower()
+
 class AuthResponse(BaseModel):
     id: str
     name: str
@@ -48,27 +107,120 @@ class BlogItem(BaseModel):
     author: Optional[str] = None
     tags: Optional[List[str]] = None
 
+# Only the fields the auth endpoints actually read
+USER_AUTH_PROJECTION = {"_id": 1, "name": 1, "email": 1, "password_hash": 1}
+
+# Emits posts already in the BlogItem shape so /blog can encode them as-is
+BLOG_PIPELINE = [
+    {"$limit": 50},
+    {"$project": {
+        "_id": 0,
+        "title": {"$ifNull": ["$title", "Untitled"]},
+        "slug": {"$ifNull": ["$slug", {"$toString": "$_id"}]},
+        "excerpt": {"$ifNull": ["$excerpt", None]},
+        "content": {"$ifNull": ["$content", ""]},
+        "author": {"$ifNull": ["$author", None]},
+        "tags": {"$ifNull": ["$tags", None]},
+    }},
+]
+
+# Seeded into an empty blogpost collection so the landing page has content
+DEMO_BLOG_POSTS = [
+    {
+        "title": "Announcing Cardify: The Modern Fintech Toolkit",
+        "slug": "announcing-cardify",
+        "excerpt": "We built a developer-first toolkit to help you launch card products faster.",
+        "content": "Cardify helps teams design, test, and launch card experiences with built-in compliance.",
+        "author": "Team Cardify",
+        "tags": ["announcement", "fintech"],
+    },
+    {
+        "title": "Designing with Glassmorphism in Real Products",
+        "slug": "glassmorphism-design",
+        "excerpt": "Practical tips for using glassmorphism without sacrificing accessibility.",
+        "content": "We cover contrast, motion, and depth to make glassmorphic UIs usable.",
+        "author": "Maya Lee",
+        "tags": ["design", "ux"],
+    },
+    {
+        "title": "From Prototype to Production: Our Infrastructure Stack",
+        "slug": "infra-stack",
+        "excerpt": "How we ship fast while staying compliant.",
+        "content": "A look at our APIs, data pipelines, and monitoring choices.",
+        "author": "Dev Team",
+        "tags": ["engineering"],
+    },
+]
+
 
 # --------- Helpers ---------
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
 
 def verify_password(password: str, hashed: str) -> bool:
-    return pwd_context.verify(password, hashed)
+    try:
+        return bcrypt.checkpw(password.encode(), hashed.encode())
+    except ValueError:
+        # Empty or non-bcrypt hash
+        return False
+
+def verify_and_update_password(password: str, hashed: str):
+    """Verify a password and return a rehash if the stored one is outdated"""
+    if not verify_password(password, hashed):
+        return False, None
+    if hashed.split("$")[2] != f"{BCRYPT_ROUNDS:02d}":
+        return True, hash_password(password)
+    return True, None
+
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    async with _hash_semaphore:
+        return await loop.run_in_executor(_hash_pool, hash_password, password)
+
+async def verify_and_update_password_async(password: str, hashed: str):
+    loop = asyncio.get_running_loop()
+    async with _hash_semaphore:
+        return await loop.run_in_executor(_hash_pool, verify_and_update_password, password, hashed)
+
+
+# --------- Startup ---------
+async def ensure_indexes(db):
+    try:
+        await db["user"].create_index([("email", 1)], unique=True)
+    except Exception as e:
+        logger.warning("Could not create user.email index: %s", e)
+
+async def seed_blog(db):
+    try:
+        if await db["blogpost"].count_documents({}, limit=1) == 0:
+            await create_documents("blogpost", DEMO_BLOG_POSTS)
+    except Exception as e:
+        logger.warning("Could not seed demo blog posts: %s", e)
 
 
 # --------- Routes ---------
+# Static bodies are encoded once at import instead of on every request
+_ROOT_RESPONSE = Response(content=orjson.dumps({"message": "SaaS Landing Backend Running"}), media_type="application/json")
+_HELLO_RESPONSE = Response(content=orjson.dumps({"message": "Hello from the backend API!"}), media_type="application/json")
+_HEALTH_RESPONSE = Response(content=orjson.dumps({"ok": True}), media_type="application/json")
+
 @app.get("/")
-def root():
-    return {"message": "SaaS Landing Backend Running"}
+async def root():
+    return _ROOT_RESPONSE
 
 @app.get("/api/hello")
-def hello():
-    return {"message": "Hello from the backend API!"}
+async def hello():
+    return _HELLO_RESPONSE
+
+@app.get("/health")
+async def health():
+    return _HEALTH_RESPONSE
 
 @app.get("/test")
-def test_database():
+async def test_database(request: Request):
+    global _collections_cache
+    db = request.app.state.db
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -84,7 +236,11 @@ def test_database():
             response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
+                if _collections_cache is not None and time.monotonic() - _collections_cache[0] < COLLECTIONS_CACHE_TTL:
+                    collections = _collections_cache[1]
+                else:
+                    collections = await db.list_collection_names()
+                    _collections_cache = (time.monotonic(), collections)
                 response["collections"] = collections[:10]
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
@@ -96,102 +252,88 @@ def test_database():
     return response
 
 # Auth
-@app.post("/auth/register", response_model=AuthResponse)
-def register(payload: RegisterRequest):
+# AuthResponse documents the response shape in OpenAPI; handlers return plain dicts
+@app.post("/auth/register", response_model=None, responses={200: {"model": AuthResponse}})
+async def register(payload: RegisterRequest, request: Request):
+    db = request.app.state.db
     if db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
 
-    existing = db["user"].find_one({"email": str(payload.email).lower()})
+    # Overlap the duplicate check with hashing so a taken email is rejected
+    # after one round trip rather than after a full hash
+    hash_task = asyncio.create_task(hash_password_async(payload.password))
+    existing = await db["user"].find_one({"email": payload.email}, projection={"_id": 1})
     if existing:
+        hash_task.cancel()
         raise HTTPException(status_code=400, detail="Email already registered")
 
     user_doc = {
         "name": payload.name,
-        "email": str(payload.email).lower(),
-        "password_hash": hash_password(payload.password),
+        "email": payload.email,
+        "password_hash": await hash_task,
         "is_active": True,
     }
-    new_id = create_document("user", user_doc)
-    return AuthResponse(id=new_id, name=user_doc["name"], email=user_doc["email"]) 
+    # The unique index still guards against a concurrent registration
+    try:
+        new_id = await create_document("user", user_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    return {"id": new_id, "name": user_doc["name"], "email": user_doc["email"]}
 
-@app.post("/auth/login", response_model=AuthResponse)
-def login(payload: LoginRequest):
+@app.post("/auth/login", response_model=None, responses={200: {"model": AuthResponse}})
+async def login(payload: LoginRequest, request: Request):
+    db = request.app.state.db
     if db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
 
-    user = db["user"].find_one({"email": str(payload.email).lower()})
+    user = await db["user"].find_one({"email": payload.email}, projection=USER_AUTH_PROJECTION)
     if not user:
         raise HTTPException(status_code=400, detail="Invalid email or password")
-    if not verify_password(payload.password, user.get("password_hash", "")):
+    valid, new_hash = await verify_and_update_password_async(payload.password, user.get("password_hash", ""))
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid email or password")
+    if new_hash:
+        await db["user"].update_one({"_id": user["_id"]}, {"$set": {"password_hash": new_hash}})
 
-    return AuthResponse(id=str(user.get("_id")), name=user.get("name"), email=user.get("email"))
+    return {"id": str(user["_id"]), "name": user.get("name"), "email": user.get("email")}
 
 # Contact
 @app.post("/contact")
-def create_contact(payload: ContactRequest):
+async def create_contact(payload: ContactRequest, request: Request):
+    db = request.app.state.db
     if db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
 
-    contact_id = create_document("contactmessage", payload.model_dump())
+    contact_id = await create_document("contactmessage", payload.model_dump())
     return {"status": "ok", "id": contact_id}
 
 # Blog
-@app.get("/blog", response_model=List[BlogItem])
-def list_blog():
+# BlogItem documents the response shape in OpenAPI only; nothing is validated per request
+@app.get("/blog", response_model=None, responses={200: {"model": List[BlogItem]}})
+async def list_blog(request: Request):
+    global _blog_cache
+    if _blog_cache is not None and time.monotonic() - _blog_cache[0] < BLOG_CACHE_TTL:
+        return Response(content=_blog_cache[1], media_type="application/json")
+
+    db = request.app.state.db
     if db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
 
-    posts = get_documents("blogpost", {}, limit=50)
-    if not posts:
-        # Seed with 3 demo posts for the landing
-        demos = [
-            {
-                "title": "Announcing Cardify: The Modern Fintech Toolkit",
-                "slug": "announcing-cardify",
-                "excerpt": "We built a developer-first toolkit to help you launch card products faster.",
-                "content": "Cardify helps teams design, test, and launch card experiences with built-in compliance.",
-                "author": "Team Cardify",
-                "tags": ["announcement", "fintech"],
-            },
-            {
-                "title": "Designing with Glassmorphism in Real Products",
-                "slug": "glassmorphism-design",
-                "excerpt": "Practical tips for using glassmorphism without sacrificing accessibility.",
-                "content": "We cover contrast, motion, and depth to make glassmorphic UIs usable.",
-                "author": "Maya Lee",
-                "tags": ["design", "ux"],
-            },
-            {
-                "title": "From Prototype to Production: Our Infrastructure Stack",
-                "slug": "infra-stack",
-                "excerpt": "How we ship fast while staying compliant.",
-                "content": "A look at our APIs, data pipelines, and monitoring choices.",
-                "author": "Dev Team",
-                "tags": ["engineering"],
-            },
-        ]
-        for d in demos:
-            create_document("blogpost", d)
-        posts = get_documents("blogpost", {}, limit=50)
-
-    # Normalize to Pydantic response
-    normalized = []
-    for p in posts:
-        normalized.append(
-            BlogItem(
-                title=p.get("title", "Untitled"),
-                slug=p.get("slug", str(p.get("_id", "post"))),
-                excerpt=p.get("excerpt"),
-                content=p.get("content", ""),
-                author=p.get("author"),
-                tags=p.get("tags"),
-            )
-        )
-    return normalized
+    posts = await db["blogpost"].aggregate(BLOG_PIPELINE, batchSize=50).to_list(length=50)
+    body = orjson.dumps(posts)
+    _blog_cache = (time.monotonic(), body)
+    return Response(content=body, media_type="application/json")
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count())),
+        log_level="warning",
+    )